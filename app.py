@@ -1,9 +1,24 @@
 import streamlit as st
 import google.generativeai as genai
-import PyPDF2
+from google.generativeai import caching
+import pypdfium2 as pdfium
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from streamlit.runtime.uploaded_file_manager import UploadedFile
+import hashlib
+import mmap
+import datetime
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import tempfile
 import re
 import os
 
+try:
+    import re2  # google-re2: linear-time DFA matching for large law texts
+except ImportError:
+    re2 = re
+
 # Configure Gemini API from Streamlit secrets
 try:
     genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
@@ -11,144 +26,523 @@ except KeyError:
     st.error("GEMINI_API_KEY not found in Streamlit secrets. Please add it to .streamlit/secrets.toml")
     st.stop()
 
-# Initialize the generative model (cached for efficiency)
+# Fixed instructions and output format for section lookups. Sent once as the system
+# instruction of the section-lookup model instead of with every prompt.
+LAW_DETAILS_INSTRUCTION = """
+You are a legal assistant specializing in Pakistan Penal Code (PPC) and Code of Criminal Procedure (CrPC).
+
+Task:
+- If law text is provided, extract information from it.
+- If law text is empty, search from your own knowledge/resources and provide accurate details.
+- If still no information is available, clearly respond with the "not available" message given in the request.
+
+Strictly provide the answer ONLY in the following format:
+دفعہ نمبر (Section Number)
+جرم (Offence)
+اردو عنوان (Urdu Title)
+تفصیل (Tafseel)
+زیادہ سے زیادہ سزا (Maximum Saza)
+کم سے کم سزا (Minimum Saza)
+ضمانت (Bailable / Non-bailable)
+قابل گرفتاری (Cognizable / Non-cognizable)
+کن عدالت میں سماعت ہوگی (Triable by)
+مثال (Example)
+کیا پولیس بغیر وارنٹ گرفتار کر سکتی ہے؟
+وارنٹ یا سمن (Warrant or Summons)
+کیا راضی نامہ ممکن ہے؟ (Compoundable or Not)
+سزا (Punishment)
+کس عدالت میں مقدمہ چلے گا؟ (Court by Which Triable)
+Suggestions (کسے بچا جا سکتا ہے)
+"""
+
+# Initialize the generative models (cached for efficiency)
 @st.cache_resource
-def get_gemini_model():
-    return genai.GenerativeModel('gemini-2.5-flash')
+def get_gemini_models():
+    """
+    Returns the general model, used for case analysis which needs reasoning, and the
+    section-lookup model, which carries LAW_DETAILS_INSTRUCTION as its system instruction.
+    Section lookup is a mostly extractive task, so it uses the faster, cheaper flash-lite.
+    """
+    return (
+        genai.GenerativeModel('gemini-2.5-flash'),
+        genai.GenerativeModel('gemini-2.5-flash-lite', system_instruction=LAW_DETAILS_INSTRUCTION),
+    )
 
-model = get_gemini_model()
+model, law_details_model = get_gemini_models()
+
+# Matches a section heading at the start of a line, i.e. the number followed by its
+# title, such as "302. Punishment of qatl-i-amd." or "[34. Acts done by ...".
+# "Section 302" style mentions are cross-references, not headings. Footnote markers
+# printed before a heading ("7, 8112." for section 112) are skipped or, when glued
+# onto the number, removed by build_section_index().
+# Byte pattern, as it runs over the memory-mapped UTF-8 law text.
+_SECTION_RE = re2.compile(r'(?m)^[ \t]*\[?(?:\d+,[ \t]*)*(\d+[A-Z]?)\.[ \t]+(?:[A-Z\["]|“)'.encode("utf-8"))
+# Largest jump between consecutive section headings that is still treated as in sequence
+_SECTION_GAP = 10
+_SECTION_DIGITS_RE = re.compile(r'\d+')
+
+# Language detection for user queries
+_ENGLISH_RE = re.compile(r'\b(?:what is|sections?)\b', re.IGNORECASE)
+# "law" only marks an English query when no other language is asked for, e.g. "law roman mein batao"
+_LAW_WORD_RE = re.compile(r'\blaws?\b', re.IGNORECASE)
+_LANGUAGE_NAME_RE = re.compile(r'\b(?:urdu|roman)\b', re.IGNORECASE)
+_URDU_SCRIPT_RE = re.compile(r'[\u0600-\u06FF]')
+_ROMAN_URDU_RE = re.compile(r'\b(?:kya|kiya|kaise|mein|mujhe|batao|lagte|hogaya)\b', re.IGNORECASE)
+
+# A section number as users write it: "302", "295C", "489-F", or "295 C" before a law name or the end
+_SECTION_NUMBER = r'\d+(?:-?[A-Z]|[ \t](?-i:[A-Z])(?=\s*(?:PPC|CrPC)\b|\s*[?؟.,]|\s*$))?\b'
+# Section references such as "Section 302 PPC", "CrPC 154", "دفعہ 420", "Dafa 489-F" or "Sections 302, 307 and 324".
+# A number only counts as a section when a section keyword or PPC/CrPC is next to it.
+_SECTION_REF_RE = re.compile(
+    r'(?P<pre>(?:(?:\b(?:PPC|CrPC|sections?|sec|dafaa?)\b\.?|دفعہ)\s*)*)'
+    rf'(?P<nums>\b{_SECTION_NUMBER}(?:\s*(?:,|&|\band\b|\bor\b|\baur\b|اور)\s*{_SECTION_NUMBER})*)'
+    r'(?:\s*\b(?P<post>PPC|CrPC)\b)?',
+    re.IGNORECASE
+)
+# A query that is just a section number and a question word, such as "420 کیا ہے؟"
+_BARE_SECTION_QUERY_RE = re.compile(
+    rf'^\s*(?:what\s+is\s+)?{_SECTION_NUMBER}\s*(?:کیا\s*ہے|kya\s+hai|kia\s+hai)?\s*[?؟]?\s*$', re.IGNORECASE
+)
+_LAW_NAME_RE = re.compile(r'\b(PPC|CrPC)\b', re.IGNORECASE)
+_SECTION_NUMBER_RE = re.compile(_SECTION_NUMBER, re.IGNORECASE)
+
+# Matches a bullet or numbered-list marker at the start of any line ("**bold**" excluded)
+_LIST_ITEM_RE = re.compile(r'^[ \t]*(?:[-+•]|\*(?!\*)|\d+\.(?!\d))[ \t]*', re.MULTILINE)
+# Start of a marked question in a batch, e.g. "Q: ...", "Q2. ..." or "سوال 1: ..."
+_QUESTION_MARKER_RE = re.compile(r'^[ \t]*(?:Q|سوال)[ \t]*\d*[ \t]*[:.)][ \t]*', re.IGNORECASE | re.MULTILINE)
+
+# Splits a batched Gemini response into its "A[1]: ...", "A[2]: ..." blocks, also when bolded ("**A[1]:**")
+_ANSWER_RE = re.compile(r'^\s*(?:\*\*)?A\[(\d+)\](?:\*\*)?:(?:\*\*)?\s*', re.MULTILINE)
+
+# Extracted PDF text is persisted here, keyed by the MD5 hash of the PDF bytes
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".pclc_cache")
+# Gemini responses are persisted here, keyed by the SHA-256 hash of the prompt
+LLM_CACHE_DIR = os.path.join(CACHE_DIR, "llm")
+
+# Responses kept in memory; older ones are evicted and read back from disk when needed
+RESPONSE_CACHE_MAX_ENTRIES = 256
 
-@st.cache_data
-def extract_text_from_pdf(uploaded_file):
+@st.cache_resource
+def get_response_cache():
+    """
+    Returns the in-memory prompt -> response LRU cache shared across sessions,
+    most recently used last. The disk cache in LLM_CACHE_DIR holds everything.
+    """
+    return OrderedDict()
+
+def generate_cached(prompt, gemini_model=None, context="", on_chunk=None, is_valid=None, response_cache=None):
+    """
+    Returns the Gemini response text for a prompt, reusing an earlier response for an
+    identical prompt from memory or disk. `context` identifies any server-side cached
+    content the prompt depends on. If `on_chunk` is given, a fresh response is streamed
+    and `on_chunk` is called with the text received so far after every chunk.
+    If `is_valid` is given, only responses for which it returns True are cached or reused.
+    Worker threads pass `response_cache`, fetched on the script thread with get_response_cache().
+    """
+    gemini_model = gemini_model or model
+    if response_cache is None:
+        response_cache = get_response_cache()
+    key = _response_cache_key(prompt, gemini_model, context)
+    text = _load_cached_response(key, response_cache)
+    if text is not None and (is_valid is None or is_valid(text)):
+        return text
+
+    if on_chunk is None:
+        text = gemini_model.generate_content(prompt).text
+    else:
+        text = ""
+        for chunk in gemini_model.generate_content(prompt, stream=True):
+            text += chunk.text
+            on_chunk(text)
+    if is_valid is None or is_valid(text):
+        _store_response(key, text, response_cache)
+    return text
+
+def _response_cache_key(prompt, gemini_model, context):
+    return hashlib.sha256(f"{gemini_model.model_name}\n{context}\n{prompt}".encode("utf-8")).hexdigest()
+
+def _load_cached_response(key, response_cache):
+    """
+    Returns the cached response for a key from memory or disk, or None on a miss.
+    """
+    text = response_cache.get(key)
+    if text is not None:
+        _remember_response(key, text, response_cache)
+        return text
+
+    cache_path = os.path.join(LLM_CACHE_DIR, f"{key}.txt")
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding="utf-8") as f:
+            text = f.read()
+        _remember_response(key, text, response_cache)
+        return text
+    return None
+
+def _remember_response(key, text, response_cache):
+    """
+    Marks a response as most recently used in the in-memory cache, evicting the least
+    recently used ones beyond RESPONSE_CACHE_MAX_ENTRIES.
     """
-    Extracts text from a given uploaded PDF file object.
+    # Each OrderedDict operation is atomic, but worker threads may interleave between
+    # them, so an entry can disappear at any point; that only costs a disk read later
+    response_cache[key] = text
+    try:
+        response_cache.move_to_end(key)
+        while len(response_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+            response_cache.popitem(last=False)
+    except KeyError:
+        pass
+
+def _store_response(key, text, response_cache):
+    """
+    Stores a non-empty response in the in-memory cache and on disk.
+    """
+    if not text:
+        return
+    _remember_response(key, text, response_cache)
+    try:
+        os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+        with open(os.path.join(LLM_CACHE_DIR, f"{key}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+    except OSError:
+        pass  # The in-memory cache still applies
+
+@st.cache_resource(ttl=datetime.timedelta(minutes=55))
+def get_law_context_model(ppc_path, crpc_path):
+    """
+    Caches the full PPC and CrPC texts server-side with Gemini context caching, so only
+    the query has to be sent per call. Returns None if context caching is unavailable.
     """
-    text = ""
     try:
-        reader = PyPDF2.PdfReader(uploaded_file)
-        for page_num in range(len(reader.pages)):
-            page = reader.pages[page_num]
-            text += page.extract_text() or ""
+        cached_content = caching.CachedContent.create(
+            model='models/gemini-2.5-flash',
+            display_name='pclc-law-texts',
+            contents=[load_law_text(ppc_path)[:].decode("utf-8"), load_law_text(crpc_path)[:].decode("utf-8")],
+            ttl=datetime.timedelta(hours=1),
+        )
+        return genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+    except Exception:
+        return None
+
+def _extract_page_range(pdf_bytes, start, end):
+    """
+    Extracts text from pages [start, end) of a PDF. Runs inside a worker process.
+    """
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    return "\n".join(pdf[i].get_textpage().get_text_range() for i in range(start, end))
+
+@st.cache_data(hash_funcs={UploadedFile: lambda f: hashlib.md5(f.getvalue()).digest()})
+def extract_text_to_cache(uploaded_file, force_refresh=False):
+    """
+    Extracts text from a given uploaded PDF file object into the on-disk cache.
+    Uses PDFium (native code) which is much faster than a pure-Python parser.
+    Pages are split into one chunk per CPU core and extracted in parallel.
+    The same PDF is only extracted once. Returns the path of the cached text file
+    (a temporary file if the cache cannot be written), or None if no text could be extracted.
+    """
+    pdf_bytes = uploaded_file.getvalue()
+    pdf_hash = hashlib.md5(pdf_bytes).hexdigest()
+    cache_path = os.path.join(CACHE_DIR, f"{pdf_hash}.txt")
+    if not force_refresh and os.path.exists(cache_path) and os.path.getsize(cache_path) > 0:
+        return cache_path
+
+    try:
+        page_count = len(pdfium.PdfDocument(pdf_bytes))
+        if page_count == 0:
+            return None
+
+        workers = min(os.cpu_count() or 1, page_count)
+        chunk_size = -(-page_count // workers)  # Ceiling division
+        starts = list(range(0, page_count, chunk_size))
+        ends = [min(start + chunk_size, page_count) for start in starts]
+
+        # PDFium is not thread-safe, so use processes rather than threads
+        with ProcessPoolExecutor(max_workers=len(starts)) as executor:
+            parts = executor.map(_extract_page_range, [pdf_bytes] * len(starts), starts, ends)
+            text = "\n".join(parts)  # map() preserves page order
     except Exception as e:
         st.error(f"Error extracting text from PDF: {e}")
         return None
-    return text
+    if not text:
+        return None
 
-def display_urdu_rtl_streamlit(text):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _write_text_file(cache_path, text)
+    except OSError as e:
+        # The text is still usable, it just won't persist across restarts. One path per
+        # PDF, so repeated extractions overwrite the file instead of piling up copies.
+        st.warning(f"Could not write PDF text cache: {e}")
+        fallback_path = os.path.join(tempfile.gettempdir(), f"pclc-{pdf_hash}.txt")
+        try:
+            _write_text_file(fallback_path, text)
+        except OSError as e:
+            st.error(f"Could not store extracted PDF text: {e}")
+            return None
+        return fallback_path
+    return cache_path
+
+def _write_text_file(path, text):
     """
-    Displays the given text with right-to-left direction using HTML and CSS in Streamlit.
+    Writes text to a temporary file and renames it into place, so a file that is
+    already memory-mapped by load_law_text() is never truncated underneath it.
     """
-    lines = text.split('\n')
-    processed_lines = []
-    list_item_pattern = re.compile(r'^\s*[-*+•]|\s*\d+\.')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
 
-    for line in lines:
-        if list_item_pattern.match(line.strip()):
-            line_without_marker = list_item_pattern.sub('', line.strip())
-            processed_lines.append(f"• {line_without_marker}")
-        else:
-            processed_lines.append(line)
+def get_law_path(uploaded_file, force_refresh=False):
+    """
+    Returns the path of the extracted text of an uploaded PDF, as extract_text_to_cache() does,
+    but re-extracts the PDF if the cached text file has been removed from disk since.
+    """
+    law_path = extract_text_to_cache(uploaded_file, force_refresh)
+    if law_path and not os.path.exists(law_path):
+        extract_text_to_cache.clear()
+        law_path = extract_text_to_cache(uploaded_file, force_refresh=True)
+    return law_path
+
+@st.cache_resource
+def load_law_text(law_path):
+    """
+    Memory-maps an extracted law text read-only. The mapping is shared by all sessions,
+    so the text lives in the OS page cache instead of being copied into each session.
+    """
+    with open(law_path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-    processed_text = '\n'.join(processed_lines)
+def read_law_text(law_path, start, end, max_chars=2000):
+    """
+    Decodes at most max_chars characters of a law text between the byte offsets start and end.
+    """
+    law_text = load_law_text(law_path)
+    # A UTF-8 character is at most 4 bytes, so only that much needs to be copied out
+    return law_text[start:min(end, start + 4 * max_chars)].decode("utf-8", errors="ignore")[:max_chars]
+
+def _footnote_digits(section_number, previous_number):
+    """
+    Returns how many leading digits of a heading number are a footnote marker glued onto it,
+    e.g. 1 for "1500" after section 499, or 0 if the number is in sequence as it is.
+    """
+    number = int(_SECTION_DIGITS_RE.match(section_number).group(0))
+    if previous_number is None or number <= previous_number + _SECTION_GAP:
+        return 0
+    for digits in (1, 2):
+        rest = section_number[digits:]
+        if rest[:1].isdigit() and rest[0] != "0":
+            if previous_number <= int(_SECTION_DIGITS_RE.match(rest).group(0)) <= previous_number + _SECTION_GAP:
+                return digits
+    return 0
+
+@st.cache_data
+def build_section_index(law_path):
+    """
+    Builds a {section_number: (start, end)} index of the law text in a single pass.
+    A section runs from its heading up to the start of the next section heading.
+    Offsets are byte offsets into the memory-mapped text.
+    """
+    law_text = load_law_text(law_path)
+    matches = list(_SECTION_RE.finditer(law_text))
+    index = {}
+    previous_number = None
+    for i, match in enumerate(matches):
+        start = match.start()
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(law_text)
+        section_number = match.group(1).decode("ascii")
+        footnote_digits = _footnote_digits(section_number, previous_number)
+        if footnote_digits:
+            section_number = section_number[footnote_digits:]
+            start = match.start(1) + footnote_digits
+        previous_number = int(_SECTION_DIGITS_RE.match(section_number).group(0))
+        # A heading also appears in the table of contents, where it is a single line.
+        # Keep the longest occurrence, which is the one in the body of the code.
+        if section_number not in index or end - start > index[section_number][1] - index[section_number][0]:
+            index[section_number] = (start, end)
+    return index
+
+# all-MiniLM-L6-v2 ignores input past max_seq_length (256) word pieces; the law texts
+# average about 5 bytes per word piece, so 4 keeps a whole chunk inside that limit
+EMBEDDING_BYTES_PER_TOKEN = 4
+
+@st.cache_resource
+def get_embedding_model():
+    return SentenceTransformer('all-MiniLM-L6-v2')
+
+@st.cache_data
+def build_embedding_index(law_path):
+    """
+    Splits the whole law text into chunks that fit the embedding model's input and embeds them once per text.
+    Chunks start at section headings; a long section is split into overlapping windows
+    that each repeat the section's heading, so the section number is never lost.
+    Returns the chunk texts and their normalized embeddings.
+    """
+    embedding_model = get_embedding_model()
+    chunk_bytes = embedding_model.max_seq_length * EMBEDDING_BYTES_PER_TOKEN
+    step = chunk_bytes - chunk_bytes // 10  # 10% overlap between windows
+    size = len(load_law_text(law_path))
+    # Each indexed heading starts a segment that runs to the next one, so together
+    # the segments cover the whole text, including anything the index does not name
+    starts = sorted({0, *(start for start, _ in build_section_index(law_path).values())})
+    sections = []
+    for start, end in zip(starts, starts[1:] + [size]):
+        heading = read_law_text(law_path, start, end, max_chars=80).split("\n", 1)[0].strip()
+        for i in range(start, end, step):
+            chunk = read_law_text(law_path, i, min(i + chunk_bytes, end), max_chars=chunk_bytes)
+            sections.append(chunk if i == start else f"{heading}\n{chunk}")
+    embeddings = embedding_model.encode(sections, normalize_embeddings=True)
+    return sections, embeddings
+
+def retrieve_relevant_sections(query, law_path, top_k=4):
+    """
+    Returns the top_k sections of the law text most similar to the query, best match first.
+    """
+    sections, embeddings = build_embedding_index(law_path)
+    query_embedding = get_embedding_model().encode(query, normalize_embeddings=True)
+    scores = embeddings @ query_embedding  # Cosine similarity, as embeddings are normalized
+    return [sections[i] for i in np.argsort(-scores)[:top_k]]
+
+# Right-to-left styling for Urdu responses; injected once per run by main()
+_RTL_STYLE = """
+<style>
+  div, p, h1, h2, h3, h4, h5, h6, ul, ol, li, blockquote {
+    direction: rtl;
+    text-align: right;
+  }
+  ul {
+    list-style: none;
+    padding-right: 20px;
+    padding-left: 0;
+  }
+   ol {
+    list-style: none;
+    padding-right: 20px;
+    padding-left: 0;
+  }
+  li {
+    text-align: right;
+    margin-right: 10px;
+  }
+  * {
+    direction: rtl;
+  }
+  div > ul > li, div > ol > li {
+      direction: rtl !important;
+      text-align: right !important;
+  }
+</style>
+"""
+
+def display_urdu_rtl_streamlit(text, container=st):
+    """
+    Displays the given text with right-to-left direction using HTML in Streamlit.
+    Relies on _RTL_STYLE having been rendered earlier in the same run.
+    Pass an `st.empty()` placeholder as `container` to replace its previous content.
+    """
+    processed_text = _LIST_ITEM_RE.sub('• ', text)
 
     rtl_html = f"""
     <div style='direction: rtl; text-align: right;'>
-      <style>
-        div, p, h1, h2, h3, h4, h5, h6, ul, ol, li, blockquote {{
-          direction: rtl;
-          text-align: right;
-        }}
-        ul {{
-          list-style: none;
-          padding-right: 20px;
-          padding-left: 0;
-        }}
-         ol {{
-          list-style: none;
-          padding-right: 20px;
-          padding-left: 0;
-        }}
-        li {{
-          text-align: right;
-          margin-right: 10px;
-        }}
-        * {{
-          direction: rtl;
-        }}
-        div > ul > li, div > ol > li {{
-            direction: rtl !important;
-            text-align: right !important;
-        }}
-      </style>
       {processed_text}
     </div>
     """
-    st.markdown(rtl_html, unsafe_allow_html=True)
+    container.markdown(rtl_html, unsafe_allow_html=True)
 
-def get_law_details(section_number, law_text, lang='ur'):
+def display_response(text, lang, container=st):
     """
-    Retrieves and formats law details for a given section using Gemini.
-    Lang: 'ur' for Urdu, 'en' for English, 'ro' for Roman Urdu.
+    Displays a Gemini response in the given container, right-to-left for Urdu.
     """
-    if not law_text:
-        return "معذرت، متعلقہ قانونی متن دستیاب نہیں ہے۔" if lang == 'ur' else "Sorry, relevant legal text is not available."
+    if lang == 'ur':
+        display_urdu_rtl_streamlit(text, container)
+    else:
+        container.markdown(text)
+
+def get_section_text(section_number, law_path, max_chars=2000):
+    """
+    Returns the statute text of a section from the section index, or "" if it is not found.
+    The default max_chars keeps the text short enough for a Gemini prompt.
+    """
+    section_index = build_section_index(law_path)
+    if section_number in section_index:
+        start, end = section_index[section_number]
+        return read_law_text(law_path, start, end, max_chars=max_chars)
+    return ""
+
+# The longest sections (e.g. PPC 499) are about 9,000 characters; the last section of a
+# code also runs into its schedules, so displayed text is still capped
+STATUTE_DISPLAY_MAX_CHARS = 10000
 
+def get_statute_text(section_number, law_path):
+    """
+    Returns the full statute text of a section only if it can be shown as-is: a line-start
+    heading followed by the body of the section. A bare one-line heading, as found in
+    the table of contents, returns "" so the lookup goes to Gemini instead.
+    """
+    section_content = get_section_text(section_number, law_path, max_chars=STATUTE_DISPLAY_MAX_CHARS + 1).strip()
+    if "\n" not in section_content:
+        return ""
+    if len(section_content) > STATUTE_DISPLAY_MAX_CHARS:
+        section_content = section_content[:STATUTE_DISPLAY_MAX_CHARS] + "\n\n*(متن مختصر کر دیا گیا ہے / truncated)*"
+    return section_content
+
+def format_section_text(section_number, section_content, lang='ur'):
+    """
+    Formats the statute text of a section for display, without a Gemini call.
+    """
+    if lang == 'ur':
+        return f"**دفعہ نمبر (Section Number):** {section_number}\n\n**قانونی متن (Law Text):**\n\n{section_content}"
+    return f"**Section Number:** {section_number}\n\n**Law Text:**\n\n{section_content}"
+
+def build_law_details_prompt(section_number, law_path, lang='ur'):
+    """
+    Builds the Gemini prompt for a section lookup.
+    Returns the prompt and the section content found in the law text ("" if not found).
+    """
     lang_map_full = {
         'en': 'English',
         'ur': 'Urdu',
         'ro': 'Roman Urdu'
     }
 
-    section_content = ""
-    pattern = re.compile(
-        r'(?:Section|SECTION|Sec\.؟|S\.|Dafaa|دفعہ)؟\s*' + re.escape(section_number) +
-        r'[\.\s:-]*[\s\S]*؟(?=(?:Section|SECTION|Sec\.؟|S\.|Dafaa|دفعہ)؟\s*\d+|$)',
-        re.IGNORECASE
-    )
-    match = pattern.search(law_text)
-
-    if match:
-        section_content = match.group(0)[:2000]  # Limit to avoid token issues
-    else:
-        section_content = ""
+    section_content = get_section_text(section_number, law_path)
 
+    # The fixed instructions and output format live in the model's system instruction
+    # (LAW_DETAILS_INSTRUCTION); the prompt carries only the per-query parts
     prompt = f"""
-    You are a legal assistant specializing in Pakistan Penal Code (PPC) and Code of Criminal Procedure (CrPC).
-    A user is asking for details about Section {section_number}.
-
-    Task:
-    - If law text is provided below, extract information from it.
-    - If law text is empty, search from your own knowledge/resources and provide accurate details.
-    - If still no information is available, clearly respond with:
-      \"{'اس کی تفصیل میرے پاس اس وقت موجود نہیں ہے۔' if lang == 'ur' else 'I do not have details for this section at the moment.'}\"
-
-    Strictly provide the answer ONLY in the following format:
-    دفعہ نمبر (Section Number)
-    جرم (Offence)
-    اردو عنوان (Urdu Title)
-    تفصیل (Tafseel)
-    زیادہ سے زیادہ سزا (Maximum Saza)
-    کم سے کم سزا (Minimum Saza)
-    ضمانت (Bailable / Non-bailable)
-    قابل گرفتاری (Cognizable / Non-cognizable)
-    کن عدالت میں سماعت ہوگی (Triable by)
-    مثال (Example)
-    کیا پولیس بغیر وارنٹ گرفتار کر سکتی ہے؟
-    وارنٹ یا سمن (Warrant or Summons)
-    کیا راضی نامہ ممکن ہے؟ (Compoundable or Not)
-    سزا (Punishment)
-    کس عدالت میں مقدمہ چلے گا؟ (Court by Which Triable)
-    Suggestions (کسے بچا جا سکتا ہے)
+    Law Text (if available):
+    {section_content}
 
     Provide the response in {lang_map_full[lang]} only.
+    Not available message: \"{'اس کی تفصیل میرے پاس اس وقت موجود نہیں ہے۔' if lang == 'ur' else 'I do not have details for this section at the moment.'}\"
 
-    Law Text (if available):
-    {section_content}
+    A user is asking for details about Section {section_number}.
+    """
+    return prompt, section_content
+
+def get_law_details(section_number, law_path, lang='ur', on_chunk=None):
+    """
+    Retrieves and formats law details for a given section using Gemini.
+    law_path: path of the extracted law text, as returned by extract_text_to_cache().
+    Lang: 'ur' for Urdu, 'en' for English, 'ro' for Roman Urdu.
+    on_chunk: optional callback that receives the partial response while it streams.
     """
+    prompt_and_content = build_law_details_prompt(section_number, law_path, lang) if law_path else None
+    return _request_law_details(prompt_and_content, lang, on_chunk=on_chunk)
 
+def _request_law_details(prompt_and_content, lang, on_chunk=None, response_cache=None):
+    """
+    Sends a (prompt, section_content) pair from build_law_details_prompt() to Gemini and
+    returns the answer, or a not-available/error message. prompt_and_content is None
+    when the law text is missing.
+    """
+    if prompt_and_content is None:
+        return "معذرت، متعلقہ قانونی متن دستیاب نہیں ہے۔" if lang == 'ur' else "Sorry, relevant legal text is not available."
+
+    prompt, section_content = prompt_and_content
     try:
-        response = model.generate_content(prompt)
-        answer = response.text.strip()
+        answer = generate_cached(
+            prompt, law_details_model, context=LAW_DETAILS_INSTRUCTION, on_chunk=on_chunk, response_cache=response_cache
+        ).strip()
 
         if not answer or ("نامعلوم" in answer and section_content == ""):
             return "اس کی تفصیل میرے پاس اس وقت موجود نہیں ہے۔" if lang == 'ur' else "I do not have details for this section at the moment."
@@ -157,12 +551,40 @@ def get_law_details(section_number, law_text, lang='ur'):
     except Exception as e:
         return f"جیمنی API سے جواب حاصل کرنے میں خرابی: {e}" if lang == 'ur' else f"Error getting response from Gemini API: {e}"
 
-def analyze_case(case_description, ppc_text, crpc_text, lang='ur'):
+# Concurrent Gemini calls per query; more only runs into the API's rate limits (HTTP 429)
+LAW_DETAILS_MAX_WORKERS = 4
+# Most sections a single query may ask for
+MAX_SECTIONS_PER_QUERY = 10
+
+def get_multiple_law_details(sections, lang='ur'):
+    """
+    Retrieves details for several sections with up to LAW_DETAILS_MAX_WORKERS concurrent
+    Gemini calls, rather than one after another. Returns the details in the order requested.
+    sections: list of (section_number, law_path) pairs, so sections may come from different laws.
+    """
+    # Prompts and the response cache are fetched here, on the script thread, so that
+    # only the blocking Gemini calls run on the worker threads
+    prompts = [
+        build_law_details_prompt(section_number, law_path, lang) if law_path else None
+        for section_number, law_path in sections
+    ]
+    response_cache = get_response_cache()
+
+    # The sync client is used from a thread pool rather than asyncio.run(): genai caches
+    # its async grpc client, which stays bound to the event loop it was first used on
+    with ThreadPoolExecutor(max_workers=min(len(prompts), LAW_DETAILS_MAX_WORKERS) or 1) as executor:
+        return list(executor.map(
+            lambda prompt_and_content: _request_law_details(prompt_and_content, lang, response_cache=response_cache),
+            prompts
+        ))
+
+def analyze_case(case_description, ppc_path, crpc_path, lang='ur', on_chunk=None):
     """
     Analyzes a given case description and suggests relevant PPC/CrPC sections.
     Provides output in the requested language.
+    on_chunk: optional callback that receives the partial response while it streams.
     """
-    if not ppc_text or not crpc_text:
+    if not ppc_path or not crpc_path:
         return "معذرت، قانونی متن دستیاب نہیں ہے کیس کے تجزیے کے لیے۔" if lang == 'ur' else "Sorry, legal text is not available for case analysis."
 
     lang_map_full = {
@@ -171,31 +593,134 @@ def analyze_case(case_description, ppc_text, crpc_text, lang='ur'):
         'ro': 'Roman Urdu'
     }
 
+    law_context_model = get_law_context_model(ppc_path, crpc_path)
+    if law_context_model:
+        # The full texts are already cached server-side; only send the query.
+        # The cache file names are content hashes, so they identify the texts.
+        law_texts = "The complete PPC and CrPC texts are provided in the cached context."
+        law_texts_hash = f"{os.path.basename(ppc_path)}:{os.path.basename(crpc_path)}"
+    else:
+        law_texts_hash = ""
+        # Only send the sections most relevant to the case, not the whole texts
+        ppc_sections = "\n".join(retrieve_relevant_sections(case_description, ppc_path))
+        crpc_sections = "\n".join(retrieve_relevant_sections(case_description, crpc_path))
+        law_texts = f"PPC Text: {ppc_sections}\n    CrPC Text: {crpc_sections}"
+
+    # Static instructions and law texts come first and the case description last,
+    # so the shared prompt prefix can be reused by Gemini's prompt caching
     prompt = f"""
-    You are a legal assistant. Analyze the following case scenario and identify the most relevant sections from the Pakistan Penal Code (PPC) and Code of Criminal Procedure (CrPC).
+    Start the response with a clear disclaimer in the requested language:
+    \"نوٹ: میں ایک مصنوعی ذہانت پر مبنی ماڈل ہوں اور آپ کو قانونی مشورہ نہیں دے سکتا۔ فراہم کردہ معلومات صرف عمومی آگاہی کے لیے ہیں۔ کسی بھی حقیقی قانونی معاملے کے لیے، یہ انتہائی ضروری ہے کہ آپ فوراً ایک مستند وکیل سے رابطہ کریں جو آپ کے کیس کا تفصیلی جائزہ لے کر درست قانونی رہنمائی فراہم کر سکے۔\"
+    (Or its English/Roman Urdu equivalent)
+
+    You are a legal assistant. Analyze the case scenario given at the end and identify the most relevant sections from the Pakistan Penal Code (PPC) and Code of Criminal Procedure (CrPC).
+
+    Relevant Sections (from PPC and CrPC texts provided, if needed, limit text to avoid exceeding token limits):
+    {law_texts}
+
     Explain why each section is relevant and then provide a summary of the potential charges.
     Also, include general suggestions on how one might be legally defended, clearly stating it's not legal advice.
+    Then, after the disclaimer, provide the analysis and suggestions.
+    Provide the output in {lang_map_full[lang]} in a clear, conversational manner.
 
     Case Scenario:
     \"{case_description}\"
+    """
 
-    Relevant Sections (from PPC and CrPC texts provided, if needed, limit text to avoid exceeding token limits):
-    PPC Text: {ppc_text[:7000]} # Adjusted limit
-    CrPC Text: {crpc_text[:7000]} # Adjusted limit
+    try:
+        return generate_cached(prompt, law_context_model, context=law_texts_hash, on_chunk=on_chunk)
+    except Exception as e:
+        return f"جیمنی API سے جواب حاصل کرنے میں خرابی: {e}" if lang == 'ur' else f"Error getting response from Gemini API: {e}"
 
-    Provide the output in {lang_map_full[lang]} in a clear, conversational manner.
-    Start the response with a clear disclaimer in the requested language:
-    \"نوٹ: میں ایک مصنوعی ذہانت پر مبنی ماڈل ہوں اور آپ کو قانونی مشورہ نہیں دے سکتا۔ فراہم کردہ معلومات صرف عمومی آگاہی کے لیے ہیں۔ کسی بھی حقیقی قانونی معاملے کے لیے، یہ انتہائی ضروری ہے کہ آپ فوراً ایک مستند وکیل سے رابطہ کریں جو آپ کے کیس کا تفصیلی جائزہ لے کر درست قانونی رہنمائی فراہم کر سکے۔\"
-    (Or its English/Roman Urdu equivalent)
+def answer_questions_batch(questions, ppc_path, crpc_path, lang='ur'):
+    """
+    Answers several questions with a single Gemini call instead of one call per question.
+    Returns a list of answers in the same order as the questions, or a one-item list
+    holding the whole response if it could not be split into per-question answers.
+    """
+    if not ppc_path or not crpc_path:
+        not_available = "معذرت، قانونی متن دستیاب نہیں ہے۔" if lang == 'ur' else "Sorry, legal text is not available."
+        return [not_available] * len(questions)
 
-    Then, after the disclaimer, provide the analysis and suggestions.
+    lang_map_full = {
+        'en': 'English',
+        'ur': 'Urdu',
+        'ro': 'Roman Urdu'
+    }
+
+    questions_block = "\n".join(f"Q[{i}]: {question}" for i, question in enumerate(questions, 1))
+    ppc_sections = "\n".join(retrieve_relevant_sections(" ".join(questions), ppc_path))
+    crpc_sections = "\n".join(retrieve_relevant_sections(" ".join(questions), crpc_path))
+    answers_block = "\n".join(f"A[{i}]: ..." for i in range(1, len(questions) + 1))
+
+    prompt = f"""
+    You are a legal assistant specializing in Pakistan Penal Code (PPC) and Code of Criminal Procedure (CrPC).
+    Answer each of the following questions separately, using the PPC and CrPC texts provided where relevant.
+    Provide every answer in {lang_map_full[lang]} only.
+
+    PPC Text: {ppc_sections}
+    CrPC Text: {crpc_sections}
+
+    {questions_block}
+
+    Respond strictly as:
+    {answers_block}
     """
 
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        # A response without any "A[i]:" block is shown whole and not cached, so asking again retries
+        response_text = generate_cached(prompt, is_valid=lambda text: _ANSWER_RE.search(text) is not None)
+        # split() yields [preamble, number, answer, number, answer, ...]
+        parts = _ANSWER_RE.split(response_text)
+        answers = {int(parts[i]): parts[i + 1].strip() for i in range(1, len(parts) - 1, 2)}
+        if not answers:
+            return [response_text.strip()]
+        no_details = "اس کی تفصیل میرے پاس اس وقت موجود نہیں ہے۔" if lang == 'ur' else "I do not have details for this question at the moment."
+        return [answers.get(i) or no_details for i in range(1, len(questions) + 1)]
     except Exception as e:
-        return f"جیمنی API سے جواب حاصل کرنے میں خرابی: {e}" if lang == 'ur' else f"Error getting response from Gemini API: {e}"
+        error = f"جیمنی API سے جواب حاصل کرنے میں خرابی: {e}" if lang == 'ur' else f"Error getting response from Gemini API: {e}"
+        return [error] * len(questions)
+
+def normalize_section_number(section_number):
+    """
+    Returns a section number in the form the section index uses, e.g. "489F" for "489-f".
+    """
+    return re.sub(r'[-\s]', '', section_number).upper()
+
+def parse_section_query(user_input):
+    """
+    Returns the sections a query asks about as a list of (law, section_number) pairs,
+    where law is 'PPC' or 'CrPC' (PPC if not named), or [] if it is not a section query.
+    """
+    if _BARE_SECTION_QUERY_RE.match(user_input):
+        return [('PPC', normalize_section_number(_SECTION_NUMBER_RE.search(user_input).group(0)))]
+
+    section_refs = []
+    for match in _SECTION_REF_RE.finditer(user_input):
+        prefix, suffix = match.group('pre'), match.group('post')
+        if not prefix and not suffix:
+            continue  # A plain number, e.g. an amount of money in a case description
+        # Each reference takes the law named right next to it
+        law_match = _LAW_NAME_RE.search(prefix) or _LAW_NAME_RE.search(suffix or "")
+        law = 'CrPC' if law_match and law_match.group(1).lower() == 'crpc' else 'PPC'
+        for section_number in _SECTION_NUMBER_RE.findall(match.group('nums')):
+            section_number = normalize_section_number(section_number)
+            if (law, section_number) not in section_refs:
+                section_refs.append((law, section_number))
+    return section_refs
+
+def parse_questions(user_input):
+    """
+    Splits an input made of marked questions ("Q1: ...", "Q2: ...") into the questions.
+    A question may run over several lines. Returns [] unless the input is two or more
+    marked questions, so an unmarked multi-line case description stays a single query.
+    """
+    parts = _QUESTION_MARKER_RE.split(user_input)
+    if len(parts) < 3 or parts[0].strip():
+        return []
+    return [" ".join(part.split()) for part in parts[1:] if part.strip()]
+
+AI_COMMENTARY_LABEL = "AI تبصرہ حاصل کریں (Get AI commentary)"
 
 # Streamlit App
 def main():
@@ -207,14 +732,22 @@ def main():
     st.sidebar.header("Upload Law Files")
     ppc_uploaded_file = st.sidebar.file_uploader("Upload Pakistan Penal Code (PPC) PDF", type="pdf", key="ppc_uploader")
     crpc_uploaded_file = st.sidebar.file_uploader("Upload Code of Criminal Procedure (CrPC) PDF", type="pdf", key="crpc_uploader")
-
-    ppc_text = None
-    crpc_text = None
+    # A button is only True on the run it is clicked in, so caches are cleared once per click
+    force_refresh = st.sidebar.button("Force refresh (re-extract PDF text)", key="force_refresh")
+    if force_refresh:
+        extract_text_to_cache.clear()
+        load_law_text.clear()
+        build_section_index.clear()
+        build_embedding_index.clear()
+
+    # Paths of the extracted texts; the texts themselves are memory-mapped on demand
+    ppc_path = None
+    crpc_path = None
 
     if ppc_uploaded_file:
         with st.spinner("Extracting text from PPC PDF..."):
-            ppc_text = extract_text_from_pdf(ppc_uploaded_file)
-        if ppc_text:
+            ppc_path = get_law_path(ppc_uploaded_file, force_refresh)
+        if ppc_path:
             st.sidebar.success("PPC PDF loaded.")
         else:
             st.sidebar.error("Failed to load PPC PDF.")
@@ -224,8 +757,8 @@ def main():
 
     if crpc_uploaded_file:
         with st.spinner("Extracting text from CrPC PDF..."):
-            crpc_text = extract_text_from_pdf(crpc_uploaded_file)
-        if crpc_text:
+            crpc_path = get_law_path(crpc_uploaded_file, force_refresh)
+        if crpc_path:
             st.sidebar.success("CrPC PDF loaded.")
         else:
             st.sidebar.error("Failed to load CrPC PDF.")
@@ -239,60 +772,110 @@ def main():
     - `420 کیا ہے؟`
     - `What is Section 302 PPC?`
     - `Chori ke baad qatal mein kya laws lagte hain?`
+
+    ایک سے زیادہ سوالات کے لیے ہر سوال `Q:` سے شروع کریں (For multiple questions, start each one with `Q:`):
+    - `Q1: 420 کیا ہے؟`
+    - `Q2: FIR kaise darj hoti hai?`
     """)
 
-    user_input = st.text_input("آپ کا سوال (Your Question):", key="user_query")
+    # A form only reruns the app when the question is submitted, not on every edit
+    with st.form("query"):
+        user_input = st.text_area("آپ کا سوال (Your Question):", key="user_query")
+        submitted = st.form_submit_button("پوچھیں (Ask)")
 
-    if user_input:
-        if not ppc_text or not crpc_text:
+    # The "Get AI commentary" button reruns the app without a submit, so keep
+    # handling the last submitted question on that rerun as well
+    if (submitted or st.session_state.get("ai_commentary")) and user_input:
+        if not ppc_path or not crpc_path:
             st.warning("Please upload both PPC and CrPC PDF files in the sidebar to use the chatbot.")
         else:
             response_lang = 'ur' # Default to Urdu
             # Language detection logic
-            if "what is" in user_input.lower() or "section" in user_input.lower() or "law" in user_input.lower() and "urdu" not in user_input.lower() and "roman" not in user_input.lower():
+            if _ENGLISH_RE.search(user_input) or (_LAW_WORD_RE.search(user_input) and not _LANGUAGE_NAME_RE.search(user_input)):
                 response_lang = 'en'
-            elif any(char.isalpha() for char in user_input) and not any(char.isascii() for char in user_input): # Basic check for Urdu script
+            elif _URDU_SCRIPT_RE.search(user_input): # Basic check for Urdu script
                 response_lang = 'ur'
-            elif any(char.isalpha() for char in user_input) and (
-                "kya" in user_input.lower() or "kiya" in user_input.lower() or
-                "kaise" in user_input.lower() or "mein" in user_input.lower() or
-                "mujhe" in user_input.lower() or "batao" in user_input.lower() or
-                "lagte" in user_input.lower() or "hogaya" in user_input.lower()
-            ): # Basic check for Roman Urdu
+            elif _ROMAN_URDU_RE.search(user_input): # Basic check for Roman Urdu
                 response_lang = 'ro'
 
-            section_match = re.search(r'\b(PPC|CrPC)؟\s*(\d+)\b', user_input, re.IGNORECASE)
-
-            if section_match:
-                law_prefix = section_match.group(1)
-                section_num = section_match.group(2)
-
-                law_text_to_use = None
-                if law_prefix and law_prefix.lower() == 'crpc':
-                    law_text_to_use = crpc_text
-                    st.info(f"CrPC کی دفعہ {section_num} کی تفصیلات نکال رہا ہوں۔")
-                else: # Default to PPC
-                    law_text_to_use = ppc_text
-                    st.info(f"PPC کی دفعہ {section_num} کی تفصیلات نکال رہا ہوں۔")
-
-                if law_text_to_use:
-                    with st.spinner("Generating details..."):
-                        details = get_law_details(section_num, law_text_to_use, lang=response_lang)
-                    if response_lang == 'ur':
-                        display_urdu_rtl_streamlit(details)
-                    else:
-                        st.write(details)
+            if response_lang == 'ur':
+                # Streamlit drops elements not re-rendered in a run, so the style
+                # is emitted once per run here rather than once per session
+                st.markdown(_RTL_STYLE, unsafe_allow_html=True)
+
+            section_refs = parse_section_query(user_input)
+
+            questions = parse_questions(user_input)
+
+            if len(questions) > 1:
+                st.info(f"{len(questions)} سوالات کے جوابات تیار کر رہا ہوں...")
+                with st.spinner("Answering questions..."):
+                    answers = answer_questions_batch(questions, ppc_path, crpc_path, lang=response_lang)
+                if len(answers) == len(questions):
+                    for question, answer in zip(questions, answers):
+                        st.markdown(f"**{question}**")
+                        if response_lang == 'ur':
+                            display_urdu_rtl_streamlit(answer)
+                        else:
+                            st.write(answer)
                 else:
-                    st.error("Error: Law text not available for the requested section.")
+                    # The response could not be split per question, so show it as it is
+                    display_response(answers[0], response_lang)
+
+            elif section_refs:
+                if len(section_refs) > MAX_SECTIONS_PER_QUERY:
+                    st.warning(
+                        f"ایک سوال میں زیادہ سے زیادہ {MAX_SECTIONS_PER_QUERY} دفعات پوچھی جا سکتی ہیں۔ "
+                        f"(At most {MAX_SECTIONS_PER_QUERY} sections can be looked up per question.)"
+                    )
+                    section_refs = section_refs[:MAX_SECTIONS_PER_QUERY]
+                law_paths = {'PPC': ppc_path, 'CrPC': crpc_path}
+                st.info(f"{', '.join(f'{law} {num}' for law, num in section_refs)} کی تفصیلات نکال رہا ہوں۔")
+
+                if len(section_refs) > 1:
+                    # Sections found in the index are shown straight away; Gemini is only
+                    # asked about the others, or about all of them once commentary is requested
+                    section_texts = {(law, num): get_statute_text(num, law_paths[law]) for law, num in section_refs}
+                    get_commentary = any(section_texts.values()) and st.button(AI_COMMENTARY_LABEL, key="ai_commentary")
+                    refs_to_fetch = [ref for ref in section_refs if get_commentary or not section_texts[ref]]
+                    all_details = {}
+                    if refs_to_fetch:
+                        with st.spinner("Generating details..."):
+                            all_details = dict(zip(refs_to_fetch, get_multiple_law_details(
+                                [(num, law_paths[law]) for law, num in refs_to_fetch], lang=response_lang
+                            )))
+                    for law, num in section_refs:
+                        st.markdown(f"**{law} دفعہ {num} ({law} Section {num})**")
+                        if section_texts[(law, num)]:
+                            display_response(format_section_text(num, section_texts[(law, num)], response_lang), response_lang)
+                        if (law, num) in all_details:
+                            display_response(all_details[(law, num)], response_lang)
+                else:
+                    law, section_num = section_refs[0]
+                    law_path_to_use = law_paths[law]
+                    # An exact hit in the section index is shown without waiting for Gemini
+                    section_content = get_statute_text(section_num, law_path_to_use)
+                    if section_content:
+                        display_response(format_section_text(section_num, section_content, response_lang), response_lang)
+                    if not section_content or st.button(AI_COMMENTARY_LABEL, key="ai_commentary"):
+                        # Render the response as it streams in, then replace it with the final text
+                        placeholder = st.empty()
+                        with st.spinner("Generating details..."):
+                            details = get_law_details(
+                                section_num, law_path_to_use, lang=response_lang,
+                                on_chunk=lambda text: display_response(text, response_lang, placeholder)
+                            )
+                        display_response(details, response_lang, placeholder)
 
             else:
                 st.info("کیس کا تجزیہ کر رہا ہوں...")
+                placeholder = st.empty()
                 with st.spinner("Analyzing case..."):
-                    analysis = analyze_case(user_input, ppc_text, crpc_text, lang=response_lang)
-                if response_lang == 'ur':
-                    display_urdu_rtl_streamlit(analysis)
-                else:
-                    st.write(analysis)
+                    analysis = analyze_case(
+                        user_input, ppc_path, crpc_path, lang=response_lang,
+                        on_chunk=lambda text: display_response(text, response_lang, placeholder)
+                    )
+                display_response(analysis, response_lang, placeholder)
 
     st.markdown("---")
     st.markdown("""